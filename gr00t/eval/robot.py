@@ -13,24 +13,139 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import Any, Dict
+import threading
+import uuid
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+import numpy as np
 
 from gr00t.data.dataset import ModalityConfig
 from gr00t.eval.service import BaseInferenceClient, BaseInferenceServer
 from gr00t.model.policy import BasePolicy
 
+# Aggregation functions f(A_t, A_new) for actions predicted by overlapping chunks
+AGGREGATE_FNS: Dict[str, Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    "weighted_average": lambda old, new: 0.3 * old + 0.7 * new,
+    "average": lambda old, new: 0.5 * old + 0.5 * new,
+    "latest_only": lambda old, new: new,
+}
+
+
+def joint_state(observations: Dict[str, Any]) -> np.ndarray:
+    """Concatenate the latest step of all `state.*` entries into a single joint-space vector."""
+    return np.concatenate(
+        [
+            np.asarray(v, dtype=np.float32).reshape(-1, np.shape(v)[-1])[-1]
+            for k, v in sorted(observations.items())
+            if k.startswith("state.")
+        ]
+    )
+
+
+def encode_video_jpeg(observations: Dict[str, Any], quality: int = 90) -> Dict[str, Any]:
+    """
+    Replace the RGB uint8 frames of all `video.*` entries with JPEG bytes, one per frame
+    (nested lists for batched input). Cuts the request size for servers started with
+    `--gpu_decode`, which decode the frames on the GPU.
+    """
+    import cv2
+
+    def encode(frames: np.ndarray) -> Any:
+        if frames.ndim > 3:
+            return [encode(f) for f in frames]
+        ok, buf = cv2.imencode(
+            ".jpg", cv2.cvtColor(frames, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, quality]
+        )
+        if not ok:
+            raise ValueError("Failed to encode frame as JPEG")
+        return buf.tobytes()
+
+    return {
+        k: encode(v) if k.startswith("video.") and isinstance(v, np.ndarray) else v
+        for k, v in observations.items()
+    }
+
 
 class RobotInferenceServer(BaseInferenceServer):
     """
     Server with three endpoints for real robot policies
+
+    The `get_action_chunk` and `get_async_config` endpoints support the asynchronous control
+    loop of `AsyncRobotInferenceClient`: observations whose joint state is within `dedup_eps`
+    of the last one processed for the same client are dropped unless marked as `must_go`.
     """
 
-    def __init__(self, model, host: str = "*", port: int = 5555):
-        super().__init__(host, port)
+    def __init__(
+        self,
+        model,
+        host: str = "*",
+        port: int = 5555,
+        num_workers: int = 1,
+        chunk_size: Optional[int] = None,
+        queue_threshold: float = 0.5,
+        dedup_eps: float = 0.0,
+        aggregate_fn: str = "weighted_average",
+        allow_shm: bool = False,
+        backend_addr: Optional[str] = None,
+    ):
+        super().__init__(
+            host,
+            port,
+            num_workers=num_workers,
+            allow_shm=allow_shm,
+            backend_addr=backend_addr,
+        )
+        self.model = model
+        self.chunk_size = chunk_size
+        self.queue_threshold = queue_threshold
+        self.dedup_eps = dedup_eps
+        self.aggregate_fn = aggregate_fn
+        # Last processed joint state per client id
+        self._last_states: Dict[Any, np.ndarray] = {}
+        self._state_lock = threading.Lock()
+
         self.register_endpoint("get_action", model.get_action)
         self.register_endpoint(
             "get_modality_config", model.get_modality_config, requires_input=False
         )
+        self.register_endpoint("get_action_chunk", self._get_action_chunk)
+        self.register_endpoint("get_async_config", self._get_async_config, requires_input=False)
+
+    def needs_processing(self, observations: Dict[str, Any], client_id: Any = None) -> bool:
+        """
+        Whether the observation moved more than `dedup_eps` in joint space since the last one
+        processed for `client_id`.
+        """
+        state = joint_state(observations)
+        with self._state_lock:
+            last_state = self._last_states.get(client_id)
+            if (
+                last_state is not None
+                and last_state.shape == state.shape
+                and np.linalg.norm(state - last_state) <= self.dedup_eps
+            ):
+                return False
+            self._last_states[client_id] = state
+            return True
+
+    def _get_action_chunk(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        observations = data["observations"]
+        if not data.get("must_go", False) and not self.needs_processing(
+            observations, data.get("client_id")
+        ):
+            return {}
+        action = self.model.get_action(observations)
+        if self.chunk_size is not None:
+            action = {k: v[: self.chunk_size] for k, v in action.items()}
+        return action
+
+    def _get_async_config(self) -> Dict[str, Any]:
+        return {
+            "chunk_size": self.chunk_size,
+            "queue_threshold": self.queue_threshold,
+            "aggregate_fn": self.aggregate_fn,
+        }
 
     @staticmethod
     def start_server(policy: BasePolicy, port: int):
@@ -48,3 +163,138 @@ class RobotInferenceClient(BaseInferenceClient, BasePolicy):
 
     def get_modality_config(self) -> Dict[str, ModalityConfig]:
         return self.call_endpoint("get_modality_config", requires_input=False)
+
+
+class AsyncRobotInferenceClient(RobotInferenceClient):
+    """
+    Client running the asynchronous control loop.
+
+    `get_next_action` pops one action per control step from a local queue. Once fewer than
+    `queue_threshold * chunk_size` actions are left, a new chunk is requested in a background
+    thread while the robot keeps executing the queued actions. Actions of the new chunk that
+    overlap with queued ones are merged with `aggregate_fn`.
+
+    The socket is used from the background thread, so do not call other endpoints while
+    a chunk request may be in flight.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 5555,
+        timeout_ms: int = 15000,
+        chunk_size: Optional[int] = None,
+        queue_threshold: Optional[float] = None,
+        aggregate_fn: Optional[str] = None,
+        use_shm: bool = False,
+    ):
+        super().__init__(host=host, port=port, timeout_ms=timeout_ms, use_shm=use_shm)
+        # Fall back to the settings the server was started with
+        config = self.call_endpoint("get_async_config", requires_input=False)
+        self.chunk_size = chunk_size or config["chunk_size"]
+        self.queue_threshold = (
+            queue_threshold if queue_threshold is not None else config["queue_threshold"]
+        )
+        self.aggregate_fn = AGGREGATE_FNS[aggregate_fn or config["aggregate_fn"]]
+
+        # Lets the server deduplicate observations per robot
+        self.client_id = uuid.uuid4().hex
+        self.timestep = 0
+        self._queue: deque[tuple[int, Dict[str, np.ndarray]]] = deque()
+        self._lock = threading.Lock()
+        self._request_thread: Optional[threading.Thread] = None
+        # Set by a failed chunk request, re-raised on the control loop thread
+        self._request_error: Optional[BaseException] = None
+
+    def get_next_action(self, observations: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        Return the action for the current control step, triggering a new chunk prediction
+        in the background when the queue runs low.
+        """
+        with self._lock:
+            queue_size = len(self._queue)
+        if queue_size == 0:
+            # Nothing to execute yet. A chunk already in flight may come back empty (dropped
+            # as a near-duplicate), so fall back to a request the server must process.
+            self._wait_for_request()
+            with self._lock:
+                queue_size = len(self._queue)
+            if queue_size == 0:
+                self._request_chunk(observations, must_go=True)
+                self._wait_for_request()
+        elif queue_size <= self.queue_threshold * (self.chunk_size or 0):
+            self._request_chunk(observations, must_go=False)
+
+        with self._lock:
+            # Drop actions for steps that have already been executed
+            while self._queue and self._queue[0][0] < self.timestep:
+                self._queue.popleft()
+            if not self._queue:
+                raise RuntimeError("No action available from the server")
+            t, action = self._queue.popleft()
+            if t != self.timestep:
+                raise RuntimeError(f"Expected the action for step {self.timestep}, got step {t}")
+            # Advance under the lock, so that a chunk merged concurrently sees a consistent step
+            self.timestep += 1
+        return action
+
+    def reset(self):
+        self._wait_for_request()
+        with self._lock:
+            self._queue.clear()
+        self.timestep = 0
+
+    def _request_chunk(self, observations: Dict[str, Any], must_go: bool):
+        if self._request_thread is not None and self._request_thread.is_alive():
+            return
+        self._raise_request_error()
+        self._request_thread = threading.Thread(
+            target=self._fetch_chunk, args=(observations, must_go, self.timestep), daemon=True
+        )
+        self._request_thread.start()
+
+    def _wait_for_request(self):
+        if self._request_thread is not None:
+            self._request_thread.join()
+        self._raise_request_error()
+
+    def _raise_request_error(self):
+        error, self._request_error = self._request_error, None
+        if error is not None:
+            raise RuntimeError("Chunk request to the server failed") from error
+
+    def _fetch_chunk(self, observations: Dict[str, Any], must_go: bool, timestep: int):
+        try:
+            self._merge_chunk(observations, must_go, timestep)
+        except Exception as e:
+            self._request_error = e
+
+    def _merge_chunk(self, observations: Dict[str, Any], must_go: bool, timestep: int):
+        chunk = self.call_endpoint(
+            "get_action_chunk",
+            {"observations": observations, "must_go": must_go, "client_id": self.client_id},
+        )
+        if not chunk:
+            # Dropped by the server as a near-duplicate observation
+            return
+        horizon = len(next(iter(chunk.values())))
+        if self.chunk_size is None:
+            self.chunk_size = horizon
+        with self._lock:
+            queued = dict(self._queue)
+            for i in range(horizon):
+                t = timestep + i
+                if t < self.timestep:
+                    continue  # already executed while the chunk was being predicted
+                new_action = {k: v[i] for k, v in chunk.items()}
+                if t in queued:
+                    queued[t] = {
+                        k: self.aggregate_fn(queued[t][k], new_action[k]) for k in new_action
+                    }
+                else:
+                    queued[t] = new_action
+            self._queue = deque(
+                sorted(
+                    ((t, a) for t, a in queued.items() if t >= self.timestep), key=lambda x: x[0]
+                )
+            )
@@ -14,12 +14,24 @@
 # limitations under the License.
 
 import pickle
+import sys
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from io import BytesIO
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
 from typing import Any, Callable, Dict
 
+import numpy as np
 import zmq
 
+# Marks a request value that refers to an array in shared memory instead of inline bytes
+SHM_KEY = "__shm__"
+# Arrays smaller than this are cheaper to send inline
+SHM_MIN_BYTES = 64 * 1024
+
 
 class TorchSerializer:
     @staticmethod
@@ -37,6 +49,25 @@ class TorchSerializer:
         return obj
 
 
+def attach_shared_arrays(data: Any, handles: list[SharedMemory]) -> Any:
+    """
+    Replace shared memory descriptors in `data` with zero-copy numpy views of the segments.
+    The opened segments are appended to `handles` so the caller can close them afterwards.
+    """
+    if not isinstance(data, dict):
+        return data
+    if SHM_KEY in data:
+        if sys.version_info >= (3, 13):
+            shm = SharedMemory(name=data[SHM_KEY], track=False)
+        else:
+            shm = SharedMemory(name=data[SHM_KEY])
+            # The client owns the segment, do not let this process unlink it on exit
+            resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+        handles.append(shm)
+        return np.ndarray(data["shape"], dtype=np.dtype(data["dtype"]), buffer=shm.buf)
+    return {k: attach_shared_arrays(v, handles) for k, v in data.items()}
+
+
 @dataclass
 class EndpointHandler:
     handler: Callable
@@ -47,13 +78,37 @@ class BaseInferenceServer:
     """
     An inference server that spin up a ZeroMQ socket and listen for incoming requests.
     Can add custom endpoints by calling `register_endpoint`.
+
+    With `num_workers > 1` the server uses a ROUTER socket and handles up to `num_workers`
+    requests concurrently, so that a handler (e.g. a batching policy) can see requests
+    from several clients at once.
+
+    With `allow_shm=True`, clients on the same host can pass large arrays through shared
+    memory (see `BaseInferenceClient(use_shm=True)`) instead of serializing them.
+
+    With `backend_addr`, the server connects to a `run_load_balancer` broker instead of
+    binding `host:port` itself, so several server processes can share one public port. The
+    `kill` endpoint then only stops the worker that happens to receive the request.
     """
 
-    def __init__(self, host: str = "*", port: int = 5555):
+    def __init__(
+        self,
+        host: str = "*",
+        port: int = 5555,
+        num_workers: int = 1,
+        allow_shm: bool = False,
+        backend_addr: str | None = None,
+    ):
         self.running = True
+        self.num_workers = num_workers
+        self.allow_shm = allow_shm
         self.context = zmq.Context()
-        self.socket = self.context.socket(zmq.REP)
-        self.socket.bind(f"tcp://{host}:{port}")
+        self.socket = self.context.socket(zmq.REP if num_workers == 1 else zmq.ROUTER)
+        if backend_addr is not None:
+            # Worker process behind `run_load_balancer`, which owns the public port
+            self.socket.connect(backend_addr)
+        else:
+            self.socket.bind(f"tcp://{host}:{port}")
         self._endpoints: dict[str, EndpointHandler] = {}
 
         # Register the ping endpoint by default
@@ -83,39 +138,126 @@ class BaseInferenceServer:
         """
         self._endpoints[name] = EndpointHandler(handler, requires_input)
 
+    def _process_message(self, message: bytes) -> bytes:
+        """
+        Decode a request, dispatch it to its endpoint and return the serialized reply.
+        """
+        handles: list[SharedMemory] = []
+        try:
+            request = TorchSerializer.from_bytes(message)
+            endpoint = request.get("endpoint", "get_action")
+
+            if endpoint not in self._endpoints:
+                raise ValueError(f"Unknown endpoint: {endpoint}")
+
+            data = request.get("data", {})
+            if request.get("shm", False):
+                if not self.allow_shm:
+                    raise ValueError("Shared memory transport is disabled on this server")
+                data = attach_shared_arrays(data, handles)
+
+            handler = self._endpoints[endpoint]
+            result = handler.handler(data) if handler.requires_input else handler.handler()
+            return TorchSerializer.to_bytes(result)
+        except Exception as e:
+            print(f"Error in server: {e}")
+            print(traceback.format_exc())
+            return b"ERROR"
+        finally:
+            data = None
+            for shm in handles:
+                try:
+                    shm.close()
+                except BufferError:
+                    pass  # a view is still alive, the segment is released once it is collected
+
     def run(self):
         addr = self.socket.getsockopt_string(zmq.LAST_ENDPOINT)
         print(f"Server is ready and listening on {addr}")
+        if self.num_workers > 1:
+            self._run_concurrent()
+            return
         while self.running:
-            try:
-                message = self.socket.recv()
-                request = TorchSerializer.from_bytes(message)
-                endpoint = request.get("endpoint", "get_action")
+            message = self.socket.recv()
+            self.socket.send(self._process_message(message))
+
+    def _run_concurrent(self):
+        """
+        Serve requests on a thread pool. ZeroMQ sockets are not thread safe, so workers hand
+        their replies back to this thread through an inproc PUSH/PULL pair.
+        """
+        reply_addr = f"inproc://replies-{id(self)}"
+        replies = self.context.socket(zmq.PULL)
+        replies.bind(reply_addr)
+        local = threading.local()
+        pushes: list[zmq.Socket] = []
 
-                if endpoint not in self._endpoints:
-                    raise ValueError(f"Unknown endpoint: {endpoint}")
+        def work(envelope: list[bytes], message: bytes):
+            if not hasattr(local, "push"):
+                local.push = self.context.socket(zmq.PUSH)
+                local.push.connect(reply_addr)
+                pushes.append(local.push)
+            local.push.send_multipart(envelope + [self._process_message(message)])
 
-                handler = self._endpoints[endpoint]
-                result = (
-                    handler.handler(request.get("data", {}))
-                    if handler.requires_input
-                    else handler.handler()
-                )
-                self.socket.send(TorchSerializer.to_bytes(result))
-            except Exception as e:
-                print(f"Error in server: {e}")
-                import traceback
+        poller = zmq.Poller()
+        poller.register(self.socket, zmq.POLLIN)
+        poller.register(replies, zmq.POLLIN)
+        with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+            while self.running:
+                events = dict(poller.poll())
+                if replies in events:
+                    self.socket.send_multipart(replies.recv_multipart())
+                if self.socket in events:
+                    # The envelope holds the routing identities and the empty delimiter frame
+                    *envelope, message = self.socket.recv_multipart()
+                    executor.submit(work, envelope, message)
+            # Flush replies that are still in flight (e.g. the reply to "kill")
+            executor.shutdown(wait=True)
+            while replies.poll(timeout=0):
+                self.socket.send_multipart(replies.recv_multipart())
+        # Open sockets would block `context.term()` forever
+        for push in pushes:
+            push.close(linger=0)
+        replies.close(linger=0)
+
+
+def run_load_balancer(host: str, port: int, backend_addr: str):
+    """
+    Accept client requests on `tcp://host:port` and forward them to the worker servers
+    connected to `backend_addr` (see `BaseInferenceServer(backend_addr=...)`).
+    ZeroMQ fair-queues the requests across the connected workers.
 
-                print(traceback.format_exc())
-                self.socket.send(b"ERROR")
+    The broker forwards messages without decoding them, so a `kill` request only stops the
+    worker it is routed to. Stop the process running the broker to shut down the service.
+    """
+    context = zmq.Context()
+    frontend = context.socket(zmq.ROUTER)
+    frontend.bind(f"tcp://{host}:{port}")
+    backend = context.socket(zmq.DEALER)
+    backend.bind(backend_addr)
+    print(f"Load balancer listening on tcp://{host}:{port}, forwarding to {backend_addr}")
+    zmq.proxy(frontend, backend)
 
 
 class BaseInferenceClient:
-    def __init__(self, host: str = "localhost", port: int = 5555, timeout_ms: int = 15000):
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 5555,
+        timeout_ms: int = 15000,
+        use_shm: bool = False,
+    ):
+        """
+        Args:
+            use_shm: Pass large arrays through shared memory instead of the socket. Only works
+                if the server runs on the same host and was started with `allow_shm=True`.
+        """
         self.context = zmq.Context()
         self.host = host
         self.port = port
         self.timeout_ms = timeout_ms
+        self.use_shm = use_shm
+        self._shm_segments: dict[str, SharedMemory] = {}
         self._init_socket()
 
     def _init_socket(self):
@@ -150,6 +292,9 @@ class BaseInferenceClient:
         """
         request: dict = {"endpoint": endpoint}
         if requires_input:
+            if self.use_shm and isinstance(data, dict):
+                data = self._to_shared_arrays(data)
+                request["shm"] = True
             request["data"] = data
 
         self.socket.send(TorchSerializer.to_bytes(request))
@@ -158,10 +303,37 @@ class BaseInferenceClient:
             raise RuntimeError("Server error")
         return TorchSerializer.from_bytes(message)
 
+    def _to_shared_arrays(self, data: dict, prefix: str = "") -> dict:
+        """
+        Copy large numpy arrays into shared memory segments and replace them with descriptors.
+        Segments are kept per key and reused across calls.
+        """
+        shared = {}
+        for k, v in data.items():
+            key = f"{prefix}{k}"
+            if isinstance(v, dict):
+                shared[k] = self._to_shared_arrays(v, prefix=f"{key}/")
+            elif isinstance(v, np.ndarray) and v.nbytes >= SHM_MIN_BYTES:
+                shm = self._shm_segments.get(key)
+                if shm is None or shm.size < v.nbytes:
+                    if shm is not None:
+                        shm.close()
+                        shm.unlink()
+                    shm = SharedMemory(create=True, size=v.nbytes)
+                    self._shm_segments[key] = shm
+                np.ndarray(v.shape, dtype=v.dtype, buffer=shm.buf)[...] = v
+                shared[k] = {SHM_KEY: shm.name, "shape": v.shape, "dtype": v.dtype.str}
+            else:
+                shared[k] = v
+        return shared
+
     def __del__(self):
         """Cleanup resources on destruction"""
         self.socket.close()
         self.context.term()
+        for shm in self._shm_segments.values():
+            shm.close()
+            shm.unlink()
 
 
 class ExternalRobotInferenceClient(BaseInferenceClient):
@@ -13,8 +13,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 from dataclasses import dataclass, field
 
+import numpy as np
 import torch
 import torch.nn.functional as F
 from torch import nn
@@ -24,6 +26,41 @@ from transformers.feature_extraction_utils import BatchFeature
 
 from .cross_attention_dit import DiT
 
+# Align-Your-Steps optimized 10-step sigma schedule for SD1.5-style models (Sabour et al., 2024),
+# same values as `diffusers.schedulers.AysSchedules["StableDiffusionSigmas"]`.
+AYS_OPTIMAL_SIGMAS = [14.615, 6.475, 3.861, 2.697, 1.886, 1.396, 0.963, 0.652, 0.399, 0.152, 0.029]
+
+
+def ays_inference_times(num_steps: int) -> np.ndarray:
+    """
+    Map the AYS sigma schedule onto flow matching times t in [0, 1] for `num_steps` euler steps.
+
+    With x_t = (1 - t) * noise + t * x, the equivalent noise level is sigma = (1 - t) / t, so
+    t = 1 / (1 + sigma). The 10-step schedule is log-linearly interpolated to `num_steps` as in
+    the AYS paper and the endpoints are pinned to pure noise (t=0) and clean actions (t=1).
+    """
+    xs = np.linspace(0, 1, len(AYS_OPTIMAL_SIGMAS))
+    log_sigmas = np.log(AYS_OPTIMAL_SIGMAS)
+    sigmas = np.exp(np.interp(np.linspace(0, 1, num_steps + 1), xs, log_sigmas))
+    times = 1.0 / (1.0 + sigmas)
+    times[0], times[-1] = 0.0, 1.0
+    return times
+
+
+@functools.lru_cache(maxsize=None)
+def inference_times(num_steps: int, schedule: str, device: torch.device) -> torch.Tensor:
+    """
+    Return the (num_steps + 1,) grid of flow matching times in [0, 1] on `device`.
+    Cached, since it is looked up on every denoising step; do not modify the result in place.
+    """
+    if schedule == "uniform":
+        times = torch.arange(num_steps + 1, dtype=torch.float64) / float(num_steps)
+    elif schedule == "ays":
+        times = torch.from_numpy(ays_inference_times(num_steps))
+    else:
+        raise ValueError(f"Unknown inference timestep schedule: {schedule}")
+    return times.to(device)
+
 
 def swish(x):
     return x * torch.sigmoid(x)
@@ -164,6 +201,10 @@ class FlowmatchingActionHeadConfig(PretrainedConfig):
         default=None,
         metadata={"help": "Number of inference steps for noise diffusion."},
     )
+    inference_timestep_schedule: str = field(
+        default="uniform",
+        metadata={"help": "Timestep schedule for inference, either 'uniform' or 'ays'."},
+    )
     max_num_embodiments: int = field(default=32, metadata={"help": "Number of embodiments."})
     tune_projector: bool = field(default=True, metadata={"help": "Whether to tune the projector."})
     tune_diffusion_model: bool = field(
@@ -192,6 +233,7 @@ class FlowmatchingActionHead(nn.Module):
         self.action_dim = config.action_dim
         self.action_horizon = config.action_horizon
         self.num_inference_timesteps = config.num_inference_timesteps
+        self.inference_timestep_schedule = config.inference_timestep_schedule
         self.state_encoder = CategorySpecificMLP(
             num_categories=config.max_num_embodiments,
             input_dim=config.max_state_dim,
@@ -319,8 +361,20 @@ class FlowmatchingActionHead(nn.Module):
         }
         return BatchFeature(data=output_dict)
 
+    def get_inference_times(self, device: torch.device | str = "cpu") -> torch.Tensor:
+        """Return the (num_inference_timesteps + 1,) grid of flow matching times in [0, 1]."""
+        return inference_times(
+            self.num_inference_timesteps, self.inference_timestep_schedule, torch.device(device)
+        )
+
     @torch.no_grad()
-    def get_action(self, backbone_output: BatchFeature, action_input: BatchFeature) -> BatchFeature:
+    def init_denoise_state(
+        self, backbone_output: BatchFeature, action_input: BatchFeature
+    ) -> BatchFeature:
+        """
+        Encode the conditioning and sample the initial noise for the denoising loop.
+        The returned state is consumed by `denoise_step`.
+        """
         # Get vision and language embeddings.
         vl_embeds = backbone_output.backbone_features
         embodiment_id = action_input.embodiment_id
@@ -330,50 +384,79 @@ class FlowmatchingActionHead(nn.Module):
 
         # Set initial actions as the sampled noise.
         batch_size = vl_embeds.shape[0]
-        device = vl_embeds.device
         actions = torch.randn(
             size=(batch_size, self.config.action_horizon, self.config.action_dim),
             dtype=vl_embeds.dtype,
-            device=device,
+            device=vl_embeds.device,
+        )
+        return BatchFeature(
+            data={
+                "vl_embeds": vl_embeds,
+                "state_features": state_features,
+                "embodiment_id": embodiment_id,
+                "actions": actions,
+            }
         )
 
-        num_steps = self.num_inference_timesteps
-        dt = 1.0 / num_steps
+    @torch.no_grad()
+    def denoise_step(self, denoise_state: BatchFeature, steps: torch.Tensor) -> torch.Tensor:
+        """
+        Run a single euler integration step and return the updated actions.
 
-        # Run denoising steps.
-        for t in range(num_steps):
-            t_cont = t / float(num_steps)  # e.g. goes 0, 1/N, 2/N, ...
-            t_discretized = int(t_cont * self.num_timestep_buckets)
+        Args:
+            denoise_state: State returned by `init_denoise_state` (possibly concatenated
+                across requests).
+            steps: Per-sample step index of shape (B,), so that samples at different points
+                of the schedule can share one forward pass.
+        """
+        vl_embeds = denoise_state["vl_embeds"]
+        state_features = denoise_state["state_features"]
+        embodiment_id = denoise_state["embodiment_id"]
+        actions = denoise_state["actions"]
+        device = vl_embeds.device
 
-            # Embed noised action trajectory.
-            timesteps_tensor = torch.full(
-                size=(batch_size,), fill_value=t_discretized, device=device
-            )
-            action_features = self.action_encoder(actions, timesteps_tensor, embodiment_id)
-            # Maybe add position embedding.
-            if self.config.add_pos_embed:
-                pos_ids = torch.arange(action_features.shape[1], dtype=torch.long, device=device)
-                pos_embs = self.position_embedding(pos_ids).unsqueeze(0)
-                action_features = action_features + pos_embs
+        # e.g. goes 0, 1/N, 2/N, ... for the uniform schedule
+        times = self.get_inference_times(device)
+        steps = steps.to(device)
+        t_cont = times[steps]
+        dt = (times[steps + 1] - t_cont)[:, None, None].to(dtype=actions.dtype)
+        timesteps_tensor = (t_cont * self.num_timestep_buckets).long()
 
-            vl_embs = vl_embeds
+        # Embed noised action trajectory.
+        action_features = self.action_encoder(actions, timesteps_tensor, embodiment_id)
+        # Maybe add position embedding.
+        if self.config.add_pos_embed:
+            pos_ids = torch.arange(action_features.shape[1], dtype=torch.long, device=device)
+            pos_embs = self.position_embedding(pos_ids).unsqueeze(0)
+            action_features = action_features + pos_embs
 
-            # Join vision, language, state and action embedding along sequence dimension.
-            sa_embs = torch.cat((state_features, action_features), dim=1)
+        # Join vision, language, state and action embedding along sequence dimension.
+        sa_embs = torch.cat((state_features, action_features), dim=1)
 
-            # Run model forward.
-            model_output = self.model(
-                hidden_states=sa_embs,
-                encoder_hidden_states=vl_embs,
-                timestep=timesteps_tensor,
-            )
-            pred = self.action_decoder(model_output, embodiment_id)
+        # Run model forward.
+        model_output = self.model(
+            hidden_states=sa_embs,
+            encoder_hidden_states=vl_embeds,
+            timestep=timesteps_tensor,
+        )
+        pred = self.action_decoder(model_output, embodiment_id)
 
-            pred_velocity = pred[:, -self.action_horizon :]
+        pred_velocity = pred[:, -self.action_horizon :]
 
-            # Update actions using euler integration.
-            actions = actions + dt * pred_velocity
-        return BatchFeature(data={"action_pred": actions})
+        # Update actions using euler integration.
+        return actions + dt * pred_velocity
+
+    @torch.no_grad()
+    def get_action(self, backbone_output: BatchFeature, action_input: BatchFeature) -> BatchFeature:
+        denoise_state = self.init_denoise_state(backbone_output, action_input)
+        batch_size = denoise_state["actions"].shape[0]
+        device = denoise_state["actions"].device
+
+        # Run denoising steps.
+        for t in range(self.num_inference_timesteps):
+            steps = torch.full(size=(batch_size,), fill_value=t, device=device)
+            denoise_state["actions"] = self.denoise_step(denoise_state, steps)
+        return BatchFeature(data={"action_pred": denoise_state["actions"]})
 
     @property
     def device(self):
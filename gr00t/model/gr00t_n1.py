@@ -14,7 +14,7 @@
 # limitations under the License.
 
 from dataclasses import dataclass, field
-from typing import Tuple
+from typing import Optional, Tuple
 
 import numpy as np
 import torch
@@ -56,6 +56,51 @@ class GR00T_N1Config(PretrainedConfig):
             setattr(self, key, value)
 
 
+class PinnedHostStager:
+    """
+    Uploads CPU tensors through persistent pinned host buffers on a dedicated CUDA stream.
+
+    Copies from pageable memory go through a hidden staging buffer and block the host. Staging
+    into page-locked buffers lets the H2D copy run asynchronously and overlap with compute of
+    the previous request that is still queued on the default stream. One buffer is kept per
+    (shape, dtype), and an event guards against overwriting it while its upload is in flight.
+    """
+
+    def __init__(self, device: torch.device, min_bytes: int = 64 * 1024):
+        self.device = torch.device(device)
+        self.min_bytes = min_bytes
+        self.stream = torch.cuda.Stream(device=self.device)
+        self._buffers: dict[tuple, tuple[torch.Tensor, torch.cuda.Event]] = {}
+
+    def to_device(self, x: torch.Tensor, dtype: Optional[torch.dtype] = None) -> torch.Tensor:
+        if x.device.type != "cpu" or x.numel() * x.element_size() < self.min_bytes:
+            return x.to(self.device, dtype=dtype)
+
+        key = (tuple(x.shape), x.dtype)
+        if key in self._buffers:
+            buffer, event = self._buffers[key]
+            # The previous upload from this buffer has to finish before it is overwritten
+            event.synchronize()
+        else:
+            buffer = torch.empty(x.shape, dtype=x.dtype, pin_memory=True)
+            event = torch.cuda.Event()
+            self._buffers[key] = (buffer, event)
+        buffer.copy_(x)
+
+        compute_stream = torch.cuda.current_stream(self.device)
+        with torch.cuda.stream(self.stream):
+            # Copy in the source dtype: a dtype conversion would be done on the host into a
+            # pageable temporary, which makes the copy synchronous again
+            out = buffer.to(self.device, non_blocking=True)
+            event.record(self.stream)
+        compute_stream.wait_stream(self.stream)
+        # The tensor is used on the compute stream, keep its memory alive until that is done
+        out.record_stream(compute_stream)
+        if dtype is not None:
+            out = out.to(dtype)  # cast on the GPU, on the compute stream
+        return out
+
+
 # real model
 class GR00T_N1(PreTrainedModel):
     supports_gradient_checkpointing = True
@@ -85,6 +130,15 @@ class GR00T_N1(PreTrainedModel):
         self.action_horizon = config.action_horizon
         self.action_dim = config.action_dim
         self.compute_dtype = config.compute_dtype
+        # Set with `enable_pinned_host_staging` to upload inputs asynchronously
+        self.host_stager: Optional[PinnedHostStager] = None
+
+    def enable_pinned_host_staging(self):
+        """Stage large CPU inputs through pinned memory and copy them with non_blocking=True."""
+        if self.device.type != "cuda":
+            print("Pinned host staging requires a CUDA device, keeping synchronous copies")
+            return
+        self.host_stager = PinnedHostStager(self.device)
 
     def validate_inputs(self, inputs):
         # NOTE -- this should be handled internally by the model
@@ -178,6 +232,18 @@ class GR00T_N1(PreTrainedModel):
         self.validate_data(action_head_outputs, backbone_outputs, is_training=False)
         return action_head_outputs
 
+    def prepare_denoise_state(
+        self,
+        inputs: dict,
+    ) -> BatchFeature:
+        """
+        Run the backbone and return the initial state for `action_head.denoise_step`.
+        Used by schedulers that drive the denoising loop step by step.
+        """
+        backbone_inputs, action_inputs = self.prepare_input(inputs)
+        backbone_outputs = self.backbone(backbone_inputs)
+        return self.action_head.init_denoise_state(backbone_outputs, action_inputs)
+
     def prepare_input(self, inputs) -> Tuple[BatchFeature, BatchFeature]:
         self.validate_inputs(inputs)
         backbone_inputs = self.backbone.prepare_input(inputs)
@@ -185,11 +251,11 @@ class GR00T_N1(PreTrainedModel):
 
         def to_device_with_maybe_dtype(x):
             # Only cast to self.compute_dtype if the tensor is floating
-            if torch.is_floating_point(x):
-                return x.to(self.device, dtype=self.action_head.dtype)
-            else:
-                # Keep original dtype
-                return x.to(self.device)
+            dtype = self.action_head.dtype if torch.is_floating_point(x) else None
+            if self.host_stager is not None:
+                return self.host_stager.to_device(x, dtype=dtype)
+            # Keep original dtype for non-floating tensors
+            return x.to(self.device, dtype=dtype)
 
         backbone_inputs = tree.map_structure(to_device_with_maybe_dtype, backbone_inputs)
         action_inputs = tree.map_structure(to_device_with_maybe_dtype, action_inputs)
@@ -13,15 +13,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import json
+import queue
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import torch
+import torch.nn.functional as F
 from huggingface_hub import snapshot_download
 from huggingface_hub.errors import HFValidationError, RepositoryNotFoundError
+from transformers.feature_extraction_utils import BatchFeature
 
 from gr00t.data.dataset import ModalityConfig
 from gr00t.data.embodiment_tags import EmbodimentTag
@@ -70,6 +77,7 @@ class Gr00tPolicy(BasePolicy):
         modality_transform: ComposedModalityTransform,
         denoising_steps: Optional[int] = None,
         device: Union[int, str] = "cuda" if torch.cuda.is_available() else "cpu",
+        compute_dtype: torch.dtype = COMPUTE_DTYPE,
     ):
         """
         Initialize the Gr00tPolicy.
@@ -81,7 +89,14 @@ class Gr00tPolicy(BasePolicy):
             embodiment_tag (Union[str, EmbodimentTag]): The embodiment tag for the model.
             denoising_steps: Number of denoising steps to use for the action head.
             device (Union[int, str]): Device to run the model on.
+            compute_dtype (torch.dtype): Dtype the weights are loaded in and autocast to. The
+                Eagle backbone uses flash attention, so only bfloat16 and float16 are supported.
         """
+        if compute_dtype not in (torch.bfloat16, torch.float16):
+            raise ValueError(
+                f"Unsupported compute dtype {compute_dtype}: the Eagle backbone uses "
+                "flash_attention_2, which only supports torch.bfloat16 and torch.float16"
+            )
         try:
             # NOTE(YL) this returns the local path to the model which is normally
             # saved in ~/.cache/huggingface/hub/
@@ -97,6 +112,8 @@ class Gr00tPolicy(BasePolicy):
         self._modality_transform.eval()  # set this to eval mode
         self.model_path = Path(model_path)
         self.device = device
+        self.compute_dtype = compute_dtype
+        self._eager_diffusion_model: Optional[torch.nn.Module] = None
 
         # Convert string embodiment tag to EmbodimentTag enum if needed
         if isinstance(embodiment_tag, str):
@@ -179,14 +196,126 @@ class Gr00tPolicy(BasePolicy):
             unnormalized_action = squeeze_dict_values(unnormalized_action)
         return unnormalized_action
 
+    def get_dummy_observation(self, instruction: str = "") -> Dict[str, Any]:
+        """
+        Build an all-zero observation matching the modality config and the checkpoint metadata.
+
+        Args:
+            instruction (str): The language instruction, which sets the length of the
+                vision-language sequence.
+        """
+        modalities = self.metadata.modalities
+        obs: Dict[str, Any] = {}
+        for key in self._modality_config["video"].modality_keys:
+            video_meta = modalities.video.get(key.split(".", 1)[1])
+            width, height = video_meta.resolution if video_meta is not None else (224, 224)
+            obs[key] = np.zeros((self._video_horizon, height, width, 3), dtype=np.uint8)
+        if "state" in self._modality_config:
+            for key in self._modality_config["state"].modality_keys:
+                dim = modalities.state[key.split(".", 1)[1]].shape[-1]
+                obs[key] = np.zeros((self._state_horizon, dim), dtype=np.float32)
+        if "language" in self._modality_config:
+            for key in self._modality_config["language"].modality_keys:
+                obs[key] = [instruction]
+        return obs
+
+    def warmup(self, num_iters: int = 2, instruction: str = "", batch_sizes: Sequence[int] = (1,)):
+        """
+        Run the policy on a dummy observation, so that one-time costs such as CUDA context
+        creation, cuDNN autotuning and graph compilation are paid before serving requests.
+
+        Args:
+            num_iters (int): Number of passes per batch size.
+            instruction (str): A representative instruction, so that the captured shapes match
+                the ones real requests use.
+            batch_sizes (Sequence[int]): The batch sizes the server will run, e.g. up to
+                `max_batch_size` when the policy is wrapped in a `BatchingPolicyWrapper`.
+        """
+        dummy_obs = self.get_dummy_observation(instruction)
+        try:
+            with torch.inference_mode():
+                for batch_size in batch_sizes:
+                    obs = dummy_obs
+                    if batch_size > 1:
+                        obs = stack_dict_values([dummy_obs] * batch_size)
+                    for _ in range(num_iters):
+                        self.get_action(obs)
+        except Exception as e:
+            if self._eager_diffusion_model is None:
+                raise
+            # Compilation only happens on the first call, so this is where it can fail
+            print(f"Warning: torch.compile failed during warm-up, falling back to eager: {e}")
+            self.model.action_head.model = self._eager_diffusion_model
+            self._eager_diffusion_model = None
+            self.warmup(num_iters, instruction, batch_sizes)
+            return
+        if torch.cuda.is_available():
+            torch.cuda.synchronize()
+
+    def compile_model(self, mode: str = "reduce-overhead"):
+        """
+        Compile the diffusion transformer of the action head with torch.compile.
+
+        The DiT runs once per denoising step, which makes it a good fit for CUDA graph replay
+        with `mode="reduce-overhead"`. Its input shapes are not fixed though: the batch size
+        varies with request batching and the vision-language sequence length with the
+        tokenized instruction. The model is therefore compiled with dynamic shapes, so a new
+        shape records a new CUDA graph but does not trigger a recompilation.
+
+        Compilation is lazy, so call `warmup` afterwards to compile and capture the graphs
+        before serving; warm-up falls back to the eager model if compilation fails. CUDA graphs
+        are thread local: warm up on the thread that serves the requests, e.g. through
+        `BatchingPolicyWrapper.warmup` when the policy is wrapped.
+        """
+        action_head = self.model.action_head
+        # Surface compilation errors during warm-up instead of silently running eagerly
+        torch._dynamo.config.suppress_errors = False
+        try:
+            compiled = torch.compile(action_head.model, mode=mode, dynamic=True, fullgraph=False)
+        except Exception as e:
+            print(f"Warning: torch.compile is not available, running eagerly: {e}")
+            return
+        self._eager_diffusion_model = action_head.model
+        action_head.model = compiled
+        print(f"Compiled the action head diffusion model with mode={mode}")
+
     def _get_action_from_normalized_input(self, normalized_input: Dict[str, Any]) -> torch.Tensor:
         # Set up autocast context if needed
-        with torch.inference_mode(), torch.autocast(device_type="cuda", dtype=COMPUTE_DTYPE):
+        with torch.inference_mode(), self._autocast():
             model_pred = self.model.get_action(normalized_input)
 
         normalized_action = model_pred["action_pred"].float()
         return normalized_action
 
+    def _autocast(self) -> torch.autocast:
+        return torch.autocast(device_type="cuda", dtype=self.compute_dtype)
+
+    def enable_pinned_host_staging(self):
+        """
+        Upload the transformed inputs (mostly camera frames) through persistent pinned host
+        buffers with non-blocking copies instead of synchronous pageable copies.
+        """
+        self.model.enable_pinned_host_staging()
+
+    def quantize_fp8_weights(self):
+        """
+        Quantize the weights of all linear layers to FP8 (weight-only) with torchao.
+        Norm and embedding layers are kept in the compute dtype.
+        """
+        try:
+            from torchao.quantization import float8_weight_only, quantize_
+        except ImportError as e:
+            raise ImportError(
+                "FP8 weight quantization requires torchao, install it with `pip install torchao`"
+            ) from e
+
+        quantize_(
+            self.model,
+            float8_weight_only(),
+            filter_fn=lambda module, fqn: isinstance(module, torch.nn.Linear),
+        )
+        print("Quantized linear layer weights to FP8")
+
     def _get_unnormalized_action(self, normalized_action: torch.Tensor) -> Dict[str, Any]:
         return self.unapply_transforms({"action": normalized_action.cpu()})
 
@@ -224,6 +353,16 @@ class Gr00tPolicy(BasePolicy):
         """Set the number of denoising steps."""
         self.model.action_head.num_inference_timesteps = value
 
+    @property
+    def timestep_schedule(self) -> str:
+        """Get the inference timestep schedule of the action head ("uniform" or "ays")."""
+        return self.model.action_head.inference_timestep_schedule
+
+    @timestep_schedule.setter
+    def timestep_schedule(self, value: str):
+        """Set the inference timestep schedule of the action head."""
+        self.model.action_head.inference_timestep_schedule = value
+
     def _check_state_is_batched(self, obs: Dict[str, Any]) -> bool:
         for k, v in obs.items():
             if "state" in k and len(v.shape) < 3:  # (B, Time, Dim)
@@ -231,7 +370,7 @@ class Gr00tPolicy(BasePolicy):
         return True
 
     def _load_model(self, model_path):
-        model = GR00T_N1.from_pretrained(model_path, torch_dtype=COMPUTE_DTYPE)
+        model = GR00T_N1.from_pretrained(model_path, torch_dtype=self.compute_dtype)
         model.eval()  # Set model to eval mode
         model.to(device=self.device)  # type: ignore
 
@@ -288,10 +427,430 @@ class Gr00tPolicy(BasePolicy):
             assert (delta_indices[1] - delta_indices[0]) > 0, f"{delta_indices=}"
 
 
+class SamplingParamsKey(NamedTuple):
+    """
+    Requests can share a denoising forward pass only if these shapes match.
+    The DiT ignores the encoder attention mask, so the vision-language sequence length is
+    part of the key instead of padding requests to a common length.
+    """
+
+    vl_shape: tuple
+    state_shape: tuple
+    action_shape: tuple
+    dtype: torch.dtype
+
+
+@dataclass(eq=False)
+class DenoiseRequest:
+    """
+    A request in flight, i.e. its denoising state and how many steps it has taken.
+    Requests compare by identity, their states hold tensors.
+    """
+
+    state: Dict[str, torch.Tensor]
+    future: Future
+    step: int = 0
+
+    @property
+    def key(self) -> SamplingParamsKey:
+        return SamplingParamsKey(
+            vl_shape=tuple(self.state["vl_embeds"].shape[1:]),
+            state_shape=tuple(self.state["state_features"].shape[1:]),
+            action_shape=tuple(self.state["actions"].shape[1:]),
+            dtype=self.state["actions"].dtype,
+        )
+
+    @property
+    def batch_size(self) -> int:
+        return self.state["actions"].shape[0]
+
+
+@dataclass
+class InputBatch:
+    """The set of requests currently being denoised."""
+
+    requests: list[DenoiseRequest] = field(default_factory=list)
+
+    def schedule(self, max_num_seqs: int) -> list[DenoiseRequest]:
+        """Pick up to `max_num_seqs` requests compatible with the oldest one."""
+        key = self.requests[0].key
+        return [r for r in self.requests if r.key == key][:max_num_seqs]
+
+    def pop_finished(self, num_steps: int) -> list[DenoiseRequest]:
+        finished = [r for r in self.requests if r.step >= num_steps]
+        self.requests = [r for r in self.requests if r.step < num_steps]
+        return finished
+
+
+class ContinuousBatchingGr00tPolicy(Gr00tPolicy):
+    """
+    Gr00tPolicy that co-batches concurrent requests at the granularity of denoising steps.
+
+    Each request is transformed on the calling thread and then handed to a scheduler thread,
+    which runs the backbone for it and adds it to the `InputBatch`. Requests that arrive
+    together and whose inputs have the same shapes (i.e. the same prompt length, so nothing
+    is padded) share one backbone forward pass. Every scheduler
+    iteration admits newly arrived requests and runs one `denoise_step` on the stacked
+    latents of up to `max_num_seqs` compatible in-flight requests, which may be at different
+    steps of the schedule. A request leaves the batch once it has taken all its steps.
+    """
+
+    def __init__(self, *args, max_num_seqs: int = 8, **kwargs):
+        """
+        Initialize the ContinuousBatchingGr00tPolicy.
+
+        Args:
+            max_num_seqs (int): Maximum number of requests sharing one denoising forward pass.
+            *args, **kwargs: Forwarded to Gr00tPolicy.
+        """
+        super().__init__(*args, **kwargs)
+        self.max_num_seqs = max_num_seqs
+        self._input_batch = InputBatch()
+        self._pending: queue.Queue = queue.Queue()
+        # The modality transforms keep some state, so they are not shared across threads
+        self._transform_lock = threading.Lock()
+        self._scheduler_thread = threading.Thread(target=self.step_scheduler, daemon=True)
+        self._scheduler_thread.start()
+
+    def apply_transforms(self, obs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._transform_lock:
+            return super().apply_transforms(obs)
+
+    def unapply_transforms(self, action: Dict[str, Any]) -> Dict[str, Any]:
+        with self._transform_lock:
+            return super().unapply_transforms(action)
+
+    def _get_action_from_normalized_input(self, normalized_input: Dict[str, Any]) -> torch.Tensor:
+        future: Future = Future()
+        self._pending.put((normalized_input, future))
+        return future.result().float()
+
+    def step_scheduler(self):
+        """Scheduler loop: admit new requests, run one denoising step, retire finished ones."""
+        while True:
+            # Only block on new requests when nothing is in flight
+            self._admit_pending(block=not self._input_batch.requests)
+            if not self._input_batch.requests:
+                continue
+
+            scheduled = self._input_batch.schedule(self.max_num_seqs)
+            try:
+                self.denoise_step(scheduled)
+            except Exception as e:
+                for request in scheduled:
+                    request.future.set_exception(e)
+                self._input_batch.requests = [
+                    r for r in self._input_batch.requests if r not in scheduled
+                ]
+
+            for request in self._input_batch.pop_finished(self.denoising_steps):
+                request.future.set_result(request.state["actions"])
+
+    def _admit_pending(self, block: bool):
+        """Drain the pending queue and run the backbone once per group of compatible requests."""
+        pending = []
+        while True:
+            try:
+                pending.append(self._pending.get(block=block and not pending))
+            except queue.Empty:
+                break
+
+        groups: Dict[Any, list] = {}
+        for normalized_input, future in pending:
+            try:
+                key = self._admission_key(normalized_input)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            groups.setdefault(key, []).append((normalized_input, future))
+        for requests in groups.values():
+            self._admit(requests)
+
+    def _admission_key(self, normalized_input: Dict[str, Any]) -> Any:
+        """Inputs can be concatenated if all shapes but the batch dimension match."""
+        key = []
+        for k, v in sorted(normalized_input.items()):
+            if isinstance(v, torch.Tensor):
+                key.append((k, tuple(v.shape[1:]), v.dtype))
+            else:
+                key.append((k, None, repr(v)))
+        return tuple(key)
+
+    def _admit(self, requests: list):
+        """Run the backbone on the concatenated inputs and split the state per request."""
+        try:
+            if len(requests) == 1:
+                inputs = requests[0][0]
+            else:
+                inputs = {
+                    k: torch.cat([r[k] for r, _ in requests]) if isinstance(v, torch.Tensor) else v
+                    for k, v in requests[0][0].items()
+                }
+            with torch.inference_mode(), self._autocast():
+                state = self.model.prepare_denoise_state(inputs)
+        except Exception as e:
+            for _, future in requests:
+                future.set_exception(e)
+            return
+
+        sizes = [r["embodiment_id"].shape[0] for r, _ in requests]
+        splits = {k: v.split(sizes, dim=0) for k, v in state.items()}
+        for i, (_, future) in enumerate(requests):
+            self._input_batch.requests.append(
+                DenoiseRequest(state={k: v[i] for k, v in splits.items()}, future=future)
+            )
+
+    def denoise_step(self, requests: list[DenoiseRequest]):
+        """Run one denoising step on the stacked latents of `requests`."""
+        batch = BatchFeature(
+            data={k: torch.cat([r.state[k] for r in requests], dim=0) for k in requests[0].state}
+        )
+        steps = torch.cat([torch.full((r.batch_size,), r.step, dtype=torch.long) for r in requests])
+        with torch.inference_mode(), self._autocast():
+            actions = self.model.action_head.denoise_step(batch, steps)
+        for request, request_actions in zip(
+            requests, actions.split([r.batch_size for r in requests], dim=0)
+        ):
+            request.state["actions"] = request_actions
+            request.step += 1
+
+
+class BatchingPolicyWrapper(BasePolicy):
+    """
+    Wraps a policy so that concurrent `get_action` calls are merged into micro-batches.
+
+    Requests are queued on a background asyncio loop. Once the first request arrives, the
+    wrapper waits at most `timeout_ms` for up to `max_batch_size` requests, stacks the
+    observations with compatible shapes along a new batch dimension, runs a single
+    `policy.get_action` on the stacked batch and slices the result back per request.
+    All calls into the wrapped policy happen on the loop thread.
+    """
+
+    def __init__(self, policy: BasePolicy, max_batch_size: int = 8, timeout_ms: float = 5.0):
+        """
+        Initialize the BatchingPolicyWrapper.
+
+        Args:
+            policy (BasePolicy): The policy to wrap.
+            max_batch_size (int): Maximum number of requests merged into one batch.
+            timeout_ms (float): Maximum time to wait for more requests after the first one.
+        """
+        self.policy = policy
+        self.max_batch_size = max_batch_size
+        self.timeout_ms = timeout_ms
+
+        self._loop = asyncio.new_event_loop()
+        self._queue: asyncio.Queue
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def get_action(self, observations: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue the observation and block until its batch has been processed.
+        """
+        future = asyncio.run_coroutine_threadsafe(self._submit(observations), self._loop)
+        return future.result()
+
+    def get_modality_config(self) -> Dict[str, ModalityConfig]:
+        return self.policy.get_modality_config()
+
+    def warmup(self, *args, **kwargs):
+        """
+        Run `policy.warmup` on the loop thread, i.e. the thread that will serve the requests.
+        CUDA graphs captured by torch.compile (`mode="reduce-overhead"`) are thread local, so
+        graphs captured on another thread would not be reused.
+        """
+        future: Future = Future()
+
+        def run():
+            try:
+                future.set_result(self.policy.warmup(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._loop.call_soon_threadsafe(run)
+        return future.result()
+
+    def _run_loop(self, ready: threading.Event):
+        asyncio.set_event_loop(self._loop)
+        self._queue = asyncio.Queue()
+        self._loop.create_task(self._batch_worker())
+        ready.set()
+        self._loop.run_forever()
+
+    async def _submit(self, observations: Dict[str, Any]) -> Dict[str, Any]:
+        future = self._loop.create_future()
+        await self._queue.put((observations, future))
+        return await future
+
+    async def _gather_batch(self) -> list:
+        """Wait for one request, then collect more until the batch is full or the timeout hits."""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.timeout_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _batch_worker(self):
+        while True:
+            batch = await self._gather_batch()
+            groups: Dict[Any, list] = {}
+            for request in batch:
+                try:
+                    key = self._batch_key(request[0])
+                except Exception as e:
+                    # A malformed observation must not take the batching loop down
+                    request[1].set_exception(e)
+                    continue
+                groups.setdefault(key, []).append(request)
+            for requests in groups.values():
+                self._run_batch(requests)
+
+    def _batch_key(self, observations: Dict[str, Any]) -> Any:
+        """
+        Requests can only be stacked if they share keys, shapes and dtypes, and the same
+        language instruction: the Eagle processor pads the prompts of a batch to a common
+        length and the DiT ignores the attention mask, so mixing prompts would change actions.
+        """
+        if _is_batched(observations):
+            # Already batched requests are forwarded on their own
+            return id(observations)
+        key = []
+        for k, v in sorted(observations.items()):
+            if isinstance(v, (np.ndarray, torch.Tensor)):
+                key.append((k, tuple(v.shape), str(v.dtype)))
+            elif isinstance(v, (list, tuple)):
+                key.append((k, None, tuple(str(x) for x in v)))
+            else:
+                key.append((k, None, str(v)))
+        return tuple(key)
+
+    def _run_batch(self, requests: list):
+        try:
+            if len(requests) == 1:
+                observations, future = requests[0]
+                future.set_result(self.policy.get_action(observations))
+                return
+            batched = stack_dict_values([observations for observations, _ in requests])
+            actions = self.policy.get_action(batched)
+            for i, (_, future) in enumerate(requests):
+                future.set_result(
+                    squeeze_dict_values({k: v[i : i + 1] for k, v in actions.items()})
+                )
+        except Exception as e:
+            for _, future in requests:
+                if not future.done():
+                    future.set_exception(e)
+
+
+class ImageDecodePolicyWrapper(BasePolicy):
+    """
+    Wraps a policy so that camera frames sent as encoded JPEG bytes are decoded on the GPU.
+
+    A `video.*` value may be a single JPEG (`bytes`), a list of JPEGs (one per frame) or a
+    list of such lists for batched requests. All frames of a request are decoded with one
+    batched nvJPEG call, resized on the GPU to the resolution in the checkpoint metadata and
+    copied back as a uint8 array of shape (T, H, W, C) (or (B, T, H, W, C)). Raw numpy frames
+    are passed through unchanged.
+    """
+
+    def __init__(
+        self,
+        policy: BasePolicy,
+        resolutions: Optional[Dict[str, Tuple[int, int]]] = None,
+        device: str = "cuda",
+    ):
+        """
+        Initialize the ImageDecodePolicyWrapper.
+
+        Args:
+            policy (BasePolicy): The policy to wrap.
+            resolutions (Dict[str, Tuple[int, int]]): (width, height) per video key, e.g.
+                {"video.image_cam_0": (640, 480)}. Frames of other keys keep their size.
+            device (str): The device to decode on, "cpu" falls back to libjpeg.
+        """
+        self.policy = policy
+        self.resolutions = resolutions or {}
+        self.device = device
+
+    def get_action(self, observations: Dict[str, Any]) -> Dict[str, Any]:
+        observations = {
+            k: self._decode(k, v) if k.startswith("video.") and _is_encoded(v) else v
+            for k, v in observations.items()
+        }
+        return self.policy.get_action(observations)
+
+    def get_modality_config(self) -> Dict[str, ModalityConfig]:
+        return self.policy.get_modality_config()
+
+    def _decode(self, key: str, value: Any) -> np.ndarray:
+        from torchvision.io import decode_jpeg
+
+        if isinstance(value, bytes):
+            value = [value]
+        batched = isinstance(value[0], (list, tuple))
+        frames = [f for group in value for f in group] if batched else list(value)
+
+        # bytearray: torch.frombuffer needs a writable buffer
+        data = [torch.frombuffer(bytearray(f), dtype=torch.uint8) for f in frames]
+        video = torch.stack(decode_jpeg(data, device=self.device))  # [N, C, H, W]
+        if key in self.resolutions:
+            width, height = self.resolutions[key]
+            if video.shape[-2:] != (height, width):
+                video = F.interpolate(
+                    video.float(), size=(height, width), mode="bilinear", antialias=True
+                )
+                video = video.round_().clamp_(0, 255).to(torch.uint8)
+        video = video.permute(0, 2, 3, 1).cpu().numpy()  # [N, H, W, C]
+        if batched:
+            video = video.reshape(len(value), -1, *video.shape[1:])
+        return video
+
+
 #######################################################################################################
 
 
 # Helper functions
+def _is_encoded(value: Any) -> bool:
+    """Whether a video value holds encoded image bytes instead of decoded frames."""
+    while isinstance(value, (list, tuple)) and len(value) > 0:
+        value = value[0]
+    return isinstance(value, bytes)
+
+
+def _is_batched(obs: Dict[str, Any]) -> bool:
+    """Same convention as Gr00tPolicy: the state is (B, Time, Dim) when batched."""
+    for k, v in obs.items():
+        if "state" in k and len(v.shape) < 3:
+            return False
+    return True
+
+
+def stack_dict_values(data: list[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Stack the values of a list of dictionaries along a new batch dimension.
+    Non-array values (e.g. language annotations) are collected into a list.
+    """
+    stacked_data = {}
+    for k, v in data[0].items():
+        values = [d[k] for d in data]
+        if isinstance(v, np.ndarray):
+            stacked_data[k] = np.stack(values, axis=0)
+        elif isinstance(v, torch.Tensor):
+            stacked_data[k] = torch.stack(values, dim=0)
+        else:
+            stacked_data[k] = values
+    return stacked_data
+
+
 def unsqueeze_dict_values(data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Unsqueeze the values of a dictionary.
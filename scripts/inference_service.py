@@ -15,15 +15,41 @@
 
 #!/usr/bin/env python3
 import os
+import importlib.util
+
+# huggingface_hub reads these when it is first imported, so they have to be set before the
+# gr00t imports below. The Rust downloader fetches large files in parallel chunks.
+if not os.environ.get("HF_HOME"):
+    os.environ["HF_HOME"] = "/persistent/huggingface_cache"
+if importlib.util.find_spec("hf_transfer") is not None:
+    os.environ.setdefault("HF_HUB_ENABLE_HF_TRANSFER", "1")
+
 import argparse
+import functools
 import json
+import multiprocessing
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import torch
 from gr00t.experiment.data_config import ConfigGenerator
-from gr00t.model.policy import Gr00tPolicy
-from gr00t.eval.robot import RobotInferenceServer
+from gr00t.model.policy import (
+    BatchingPolicyWrapper,
+    ContinuousBatchingGr00tPolicy,
+    Gr00tPolicy,
+    ImageDecodePolicyWrapper,
+)
+from gr00t.eval.robot import AGGREGATE_FNS, RobotInferenceServer
+from gr00t.eval.service import run_load_balancer
 from gr00t.data.transform.base import ComposedModalityTransform
-from typing import cast
+from typing import Optional, cast
+
+try:
+    import orjson
+except ImportError:  # optional, fall back to the standard library parser
+    orjson = None
 
+@functools.lru_cache(maxsize=None)
 def is_huggingface_repo(path: str) -> bool:
     """Check if the path looks like a HuggingFace repository ID."""
     # HuggingFace repos typically have format: username/repo-name
@@ -33,21 +59,54 @@ def is_huggingface_repo(path: str) -> bool:
             not path.startswith('/') and
             not os.path.exists(path))  # Not a local directory
 
-def detect_model_config(model_path: str, default_num_cams: int = 2) -> tuple[int, int, list[str]]:
+# Small files needed to build the data config, and the checkpoint weights
+CONFIG_PATTERNS = ["experiment_cfg/*", "*.json"]
+WEIGHT_PATTERNS = ["*.safetensors", "*.bin"]
+
+def resolve_model_path(
+    model_path: str, is_hf: bool, allow_patterns: list[str] = CONFIG_PATTERNS + WEIGHT_PATTERNS
+) -> Path:
+    """
+    Resolve the model path to a local directory.
+    HuggingFace repos (`is_hf`, see `is_huggingface_repo`) are downloaded here, restricted to
+    `allow_patterns`, and the returned snapshot directory is reused for metadata parsing and
+    for loading the policy.
+    """
+    if is_hf:
+        from huggingface_hub import snapshot_download
+        from huggingface_hub.errors import HFValidationError, RepositoryNotFoundError
+
+        try:
+            snapshot = snapshot_download(
+                repo_id=model_path,
+                repo_type="model",
+                allow_patterns=allow_patterns,
+                # Fetch the checkpoint shards over parallel connections
+                max_workers=16,
+                etag_timeout=30,
+            )
+        except (HFValidationError, RepositoryNotFoundError) as e:
+            raise FileNotFoundError(
+                f"HuggingFace repository '{model_path}' not found or not accessible."
+            ) from e
+        return Path(snapshot)
+    return Path(model_path)
+
+def load_metadata(model_path: Path) -> dict:
+    """Parse experiment_cfg/metadata.json straight from bytes, using orjson when available."""
+    # Align with policy._load_metadata: metadata.json is under experiment_cfg
+    with open(model_path / "experiment_cfg" / "metadata.json", "rb") as f:
+        raw = f.read()
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+def detect_model_config(model_path: Path, default_num_cams: int = 2) -> tuple[int, int, list[str]]:
     """
     Auto-detect number of arms, cameras, and video keys from model metadata.
+    Expects the local model directory returned by `resolve_model_path`.
     Returns (num_arms, num_cams, video_keys)
     """
     try:
-        # Align with policy._load_metadata: metadata.json is under experiment_cfg
-        if is_huggingface_repo(model_path):
-            from huggingface_hub import snapshot_download
-            snapshot = snapshot_download(repo_id=model_path, repo_type="model")
-            metadata_path = Path(snapshot) / "experiment_cfg" / "metadata.json"
-        else:
-            metadata_path = Path(model_path) / "experiment_cfg" / "metadata.json"
-        
-        metadata = json.loads(metadata_path.read_text())
+        metadata = load_metadata(model_path)
         # Extract video keys
         video_keys = list(metadata.get('modalities', {}).get('video', {}).keys())
         num_cams = len(video_keys)
@@ -57,6 +116,16 @@ def detect_model_config(model_path: str, default_num_cams: int = 2) -> tuple[int
     except Exception:
         return 1, default_num_cams, []  # fallback
 
+def detect_embodiment_tag(model_path: Path, default: str = "new_embodiment") -> str:
+    """
+    Auto-detect the embodiment tag from the top-level keys of experiment_cfg/metadata.json.
+    """
+    try:
+        metadata = load_metadata(model_path)
+        return next(iter(metadata.keys()))
+    except Exception:
+        return default
+
 def main():
     parser = argparse.ArgumentParser("Gr00t Inference Server")
     parser.add_argument(
@@ -79,6 +148,27 @@ def main():
         "--denoising_steps", type=int, default=4,
         help="Number of diffusion denoising steps"
     )
+    parser.add_argument(
+        "--schedule", type=str, default="uniform", choices=["uniform", "ays"],
+        help="Denoising timestep schedule; 'ays' uses the Align-Your-Steps optimized schedule"
+    )
+    parser.add_argument(
+        "--dtype", type=str, default="bf16", choices=["bf16", "fp8"],
+        help="Model precision; 'fp8' quantizes linear layer weights with torchao on top of bf16"
+    )
+    parser.add_argument(
+        "--compile", type=str, default="none",
+        choices=["none", "default", "reduce-overhead", "max-autotune"],
+        help="torch.compile mode for the action head diffusion model ('none' runs eagerly)"
+    )
+    parser.add_argument(
+        "--warmup_steps", type=int, default=2,
+        help="Number of dummy inference passes to run before serving (0 disables warm-up)"
+    )
+    parser.add_argument(
+        "--warmup_instruction", type=str, default="",
+        help="Instruction used for warm-up, set it to what the robots send to capture matching shapes"
+    )
     parser.add_argument(
         "--host", type=str, default="0.0.0.0",
         help="Server bind address"
@@ -87,43 +177,84 @@ def main():
         "--port", type=int, default=5555,
         help="Server port"
     )
+    parser.add_argument(
+        "--num_workers", type=int, default=1,
+        help="Number of server processes, one per GPU, sharing the port through a load balancer"
+    )
+    parser.add_argument(
+        "--max_batch_size", type=int, default=8,
+        help="Maximum number of concurrent requests merged into one policy call (1 disables batching)"
+    )
+    parser.add_argument(
+        "--batch_timeout_ms", type=float, default=5.0,
+        help="Maximum time to wait for more requests before running a batch"
+    )
+    parser.add_argument(
+        "--continuous_batching", "--continuous-batching", type=int, default=0,
+        dest="max_num_seqs",
+        help="Co-batch in-flight requests at every denoising step, up to this many requests "
+        "per forward pass (0 disables continuous batching)"
+    )
+    parser.add_argument(
+        "--pinned_memory", action="store_true",
+        help="Upload camera frames through pinned host buffers with non-blocking copies"
+    )
+    parser.add_argument(
+        "--shm", action="store_true",
+        help="Accept camera frames through shared memory from clients on the same host"
+    )
+    parser.add_argument(
+        "--gpu_decode", action="store_true",
+        help="Decode JPEG camera frames (see encode_video_jpeg) on the GPU with nvJPEG"
+    )
+    # Asynchronous control loop settings, served to AsyncRobotInferenceClient
+    parser.add_argument(
+        "--chunk_size", type=int, default=None,
+        help="Number of actions returned per chunk (defaults to the full action horizon)"
+    )
+    parser.add_argument(
+        "--queue_threshold", type=float, default=0.5,
+        help="Clients request a new chunk once fewer than queue_threshold * chunk_size actions are queued"
+    )
+    parser.add_argument(
+        "--dedup_eps", type=float, default=0.0,
+        help="Drop async observations within this joint-space distance of the last processed one"
+    )
+    parser.add_argument(
+        "--aggregate_fn", type=str, default="weighted_average", choices=list(AGGREGATE_FNS),
+        help="How clients merge overlapping actions of consecutive chunks"
+    )
     args = parser.parse_args()
-    
-    # Set HF_HOME if not set
-    if not os.environ.get("HF_HOME"):
-        os.environ["HF_HOME"] = "/persistent/huggingface_cache"
+
+    # Fail before downloading anything: extra workers would start on nonexistent devices
+    # while the load balancer keeps routing requests to them
+    if args.num_workers > 1 and args.num_workers > torch.cuda.device_count():
+        raise ValueError(
+            f"--num_workers={args.num_workers} needs one GPU per worker, "
+            f"but only {torch.cuda.device_count()} are visible"
+        )
     
     print(f"Using model: {args.model_path}")
     print(f"HF_HOME: {os.environ.get('HF_HOME')}")
     
     # Validate model path - distinguish between HuggingFace repos and local paths
-    def is_huggingface_repo(path: str) -> bool:
-        """Check if the path looks like a HuggingFace repository ID."""
-        # HuggingFace repos typically have format: username/repo-name
-        # They don't start with ./ or / and contain at least one /
-        return ('/' in path and 
-                not path.startswith('./') and 
-                not path.startswith('/') and
-                not os.path.exists(path))  # Not a local directory
-    
-    def validate_huggingface_repo(repo_id: str) -> bool:
-        """Validate that a HuggingFace repository exists and is accessible."""
-        try:
-            from huggingface_hub import repo_exists
-            return repo_exists(repo_id, repo_type="model")
-        except Exception as e:
-            print(f"Warning: Could not validate HuggingFace repo '{repo_id}': {e}")
-            return True  # Assume valid and let policy handle any errors
-    
-    if is_huggingface_repo(args.model_path):
+    is_hf = is_huggingface_repo(args.model_path)
+    if is_hf:
         print(f"Detected HuggingFace repo: {args.model_path}")
-        if not validate_huggingface_repo(args.model_path):
-            raise FileNotFoundError(f"HuggingFace repository '{args.model_path}' not found or not accessible.")
     elif not os.path.exists(args.model_path):
         raise FileNotFoundError(f"Local model path '{args.model_path}' not found.")
-    
+
+    # Fetch the small config files first, which also checks that the repo exists. The weights
+    # download in the background while the metadata is parsed and the data config is built.
+    model_dir = resolve_model_path(args.model_path, is_hf, allow_patterns=CONFIG_PATTERNS)
+    weights_future = None
+    if is_hf:
+        weights_future = ThreadPoolExecutor(max_workers=1).submit(
+            resolve_model_path, args.model_path, is_hf, WEIGHT_PATTERNS
+        )
+
     # Auto-detect camera configuration from model metadata
-    num_arms, num_cams, video_keys = detect_model_config(args.model_path, args.num_cams)
+    num_arms, num_cams, video_keys = detect_model_config(model_dir, args.num_cams)
 
     # Use detected configuration to override defaults
     args.num_arms = num_arms
@@ -140,4 +271,129 @@ def main():
         data_gen = ConfigGeneratorFromNames(prefixed_video_keys, state_keys, action_keys)
     else:
         data_gen = ConfigGenerator(num_arms=args.num_arms, num_cams=args.num_cams)
-    
\ No newline at end of file
+
+    if not args.embodiment_tag:
+        args.embodiment_tag = detect_embodiment_tag(model_dir)
+        print(f"Auto-detected embodiment tag: {args.embodiment_tag}")
+
+    if weights_future is not None:
+        print("Waiting for the checkpoint weights download to finish")
+        model_dir = weights_future.result()
+
+    if args.num_workers > 1:
+        serve_workers(args, model_dir, data_gen)
+    else:
+        serve(args, model_dir, data_gen)
+
+
+def serve_workers(args, model_dir: Path, data_gen):
+    """
+    Start one server process per GPU behind a ZeroMQ load balancer that owns the public port.
+    """
+    backend_addr = f"ipc://{tempfile.gettempdir()}/gr00t-{args.port}.ipc"
+    visible = os.environ.get("CUDA_VISIBLE_DEVICES")
+    # main() checked that there is one visible GPU per worker
+    devices = visible.split(",") if visible else [str(i) for i in range(args.num_workers)]
+    # CUDA must not be initialized before CUDA_VISIBLE_DEVICES is set, hence "spawn"
+    ctx = multiprocessing.get_context("spawn")
+    for i in range(args.num_workers):
+        # The child inherits the environment at start time
+        os.environ["CUDA_VISIBLE_DEVICES"] = devices[i]
+        ctx.Process(
+            target=serve, args=(args, model_dir, data_gen, backend_addr), daemon=True
+        ).start()
+        print(f"Started worker {i} on GPU {devices[i]}")
+    if visible is None:
+        del os.environ["CUDA_VISIBLE_DEVICES"]
+    else:
+        os.environ["CUDA_VISIBLE_DEVICES"] = visible
+    run_load_balancer(args.host, args.port, backend_addr)
+
+
+def serve(args, model_dir: Path, data_gen, backend_addr: Optional[str] = None):
+    """Build the policy and run the inference server (behind a load balancer if `backend_addr`)."""
+    # Passing the resolved local directory lets from_pretrained hit the local snapshot directly
+    policy_kwargs = dict(
+        model_path=str(model_dir),
+        embodiment_tag=args.embodiment_tag,
+        modality_config=data_gen.modality_config(),
+        modality_transform=cast(ComposedModalityTransform, data_gen.transform()),
+        denoising_steps=args.denoising_steps,
+        compute_dtype=torch.bfloat16,
+    )
+    if args.max_num_seqs > 0:
+        policy = ContinuousBatchingGr00tPolicy(**policy_kwargs, max_num_seqs=args.max_num_seqs)
+    else:
+        policy = Gr00tPolicy(**policy_kwargs)
+    policy.timestep_schedule = args.schedule
+    print(
+        f"Loaded Gr00tPolicy from {args.model_path} [embodiment={args.embodiment_tag}] "
+        f"with {args.denoising_steps} {args.schedule} steps."
+    )
+
+    if args.pinned_memory:
+        policy.enable_pinned_host_staging()
+
+    if args.dtype == "fp8":
+        policy.quantize_fp8_weights()
+
+    if args.compile != "none":
+        policy.compile_model(mode=args.compile)
+
+    # Frames are resized to the resolution the checkpoint was trained with
+    resolutions = {
+        f"video.{k}": tuple(v.resolution) for k, v in policy.metadata.modalities.video.items()
+    }
+
+    if args.max_num_seqs > 0:
+        # The policy schedules denoising steps itself, it only needs concurrent requests
+        num_threads = args.max_num_seqs
+        print(f"Continuous batching with up to {args.max_num_seqs} requests per denoising step")
+    elif args.max_batch_size > 1:
+        # Serve several clients concurrently and merge their observations into micro-batches
+        policy = BatchingPolicyWrapper(
+            policy, max_batch_size=args.max_batch_size, timeout_ms=args.batch_timeout_ms
+        )
+        num_threads = args.max_batch_size
+        print(f"Batching up to {args.max_batch_size} requests with {args.batch_timeout_ms}ms timeout")
+    else:
+        num_threads = 1
+
+    if args.warmup_steps > 0:
+        # Pay for CUDA context creation, autotuning and compilation before the first request.
+        # This runs after wrapping: BatchingPolicyWrapper warms up on its loop thread, which
+        # serves the requests, since CUDA graphs captured by torch.compile are thread local.
+        # Warm up every batch size the batching above can produce.
+        max_batch_size = max(args.max_num_seqs if args.max_num_seqs > 0 else args.max_batch_size, 1)
+        print(
+            f"Warming up the policy with {args.warmup_steps} dummy inference passes "
+            f"for batch sizes 1 to {max_batch_size}"
+        )
+        policy.warmup(
+            num_iters=args.warmup_steps,
+            instruction=args.warmup_instruction,
+            batch_sizes=range(1, max_batch_size + 1),
+        )
+
+    if args.gpu_decode:
+        # Decode before batching, so that the batching loop thread only runs the model
+        policy = ImageDecodePolicyWrapper(policy, resolutions=resolutions, device="cuda")
+        print("Decoding JPEG camera frames on the GPU")
+    server = RobotInferenceServer(
+        policy,
+        host=args.host,
+        port=args.port,
+        num_workers=num_threads,
+        chunk_size=args.chunk_size,
+        queue_threshold=args.queue_threshold,
+        dedup_eps=args.dedup_eps,
+        aggregate_fn=args.aggregate_fn,
+        allow_shm=args.shm,
+        backend_addr=backend_addr,
+    )
+    print(f"Starting Gr00t server at {args.host}:{args.port}")
+    server.run()
+
+
+if __name__ == "__main__":
+    main()
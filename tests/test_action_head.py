@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+import torch
+
+from gr00t.model.action_head.flow_matching_action_head import ays_inference_times, inference_times
+
+
+@pytest.mark.parametrize("num_steps", [1, 4, 10, 16])
+def test_ays_inference_times(num_steps):
+    times = ays_inference_times(num_steps)
+    assert times.shape == (num_steps + 1,)
+    assert times[0] == 0.0 and times[-1] == 1.0
+    assert np.all(np.diff(times) > 0)
+
+
+def test_inference_times_is_cached_per_device():
+    times = inference_times(4, "uniform", torch.device("cpu"))
+    torch.testing.assert_close(
+        times, torch.tensor([0.0, 0.25, 0.5, 0.75, 1.0], dtype=torch.float64)
+    )
+    assert inference_times(4, "uniform", torch.device("cpu")) is times
+    with pytest.raises(ValueError):
+        inference_times(4, "cosine", torch.device("cpu"))
@@ -0,0 +1,23 @@
+import pytest
+import torch
+
+from gr00t.model.gr00t_n1 import PinnedHostStager
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="Pinned host staging requires CUDA")
+def test_pinned_host_stager_uploads_and_casts():
+    stager = PinnedHostStager(torch.device("cuda"), min_bytes=1024)
+    frames = torch.rand(2, 3, 224, 224)
+
+    for _ in range(2):  # the second upload reuses the pinned buffer
+        out = stager.to_device(frames, dtype=torch.bfloat16)
+        assert out.device.type == "cuda"
+        assert out.dtype == torch.bfloat16
+        torch.testing.assert_close(out.float().cpu(), frames.to(torch.bfloat16).float())
+    assert len(stager._buffers) == 1
+    assert stager._buffers[(tuple(frames.shape), torch.float32)][0].is_pinned()
+
+    # Small and integer tensors take the plain path and keep their dtype
+    ids = torch.arange(8)
+    assert stager.to_device(ids).dtype == torch.long
+    assert len(stager._buffers) == 1
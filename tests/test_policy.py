@@ -0,0 +1,303 @@
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+from transformers.feature_extraction_utils import BatchFeature
+
+from gr00t.eval.robot import encode_video_jpeg
+from gr00t.model.action_head.flow_matching_action_head import (
+    FlowmatchingActionHead,
+    FlowmatchingActionHeadConfig,
+)
+from gr00t.model.policy import (
+    BasePolicy,
+    BatchingPolicyWrapper,
+    ContinuousBatchingGr00tPolicy,
+    DenoiseRequest,
+    Gr00tPolicy,
+    ImageDecodePolicyWrapper,
+    InputBatch,
+    stack_dict_values,
+)
+
+
+class RecordingPolicy(BasePolicy):
+    """Echoes the last state value as the action and records the batch sizes it sees."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def get_action(self, observations):
+        state = observations["state.arm_0"]
+        if state.ndim < 3:
+            self.batch_sizes.append(1)
+            return {"action.arm_0": np.repeat(state[-1:], 16, axis=0)}
+        self.batch_sizes.append(state.shape[0])
+        return {"action.arm_0": np.repeat(state[:, -1:], 16, axis=1)}
+
+    def get_modality_config(self):
+        return {}
+
+
+def make_obs(value: float, task: str = "pick up the cube"):
+    return {
+        "video.image_cam_0": np.zeros((1, 8, 8, 3), dtype=np.uint8),
+        "state.arm_0": np.full((1, 6), value, dtype=np.float32),
+        "annotation.human.task_description": task,
+    }
+
+
+def test_stack_dict_values():
+    stacked = stack_dict_values([make_obs(0.0, "task 0"), make_obs(1.0, "task 1")])
+    assert stacked["video.image_cam_0"].shape == (2, 1, 8, 8, 3)
+    assert stacked["state.arm_0"].shape == (2, 1, 6)
+    assert stacked["annotation.human.task_description"] == ["task 0", "task 1"]
+
+
+def test_batching_policy_wrapper_merges_concurrent_requests():
+    policy = RecordingPolicy()
+    wrapper = BatchingPolicyWrapper(policy, max_batch_size=4, timeout_ms=200)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda v: wrapper.get_action(make_obs(v)), range(4)))
+
+    for value, result in enumerate(results):
+        assert result["action.arm_0"].shape == (16, 6)
+        np.testing.assert_allclose(result["action.arm_0"], value)
+    assert sum(policy.batch_sizes) == 4
+    assert max(policy.batch_sizes) > 1
+
+
+def test_batching_policy_wrapper_keeps_different_instructions_apart():
+    policy = RecordingPolicy()
+    wrapper = BatchingPolicyWrapper(policy, max_batch_size=4, timeout_ms=200)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(lambda v: wrapper.get_action(make_obs(v, task=f"task {v % 2}")), range(4))
+        )
+
+    for value, result in enumerate(results):
+        np.testing.assert_allclose(result["action.arm_0"], value)
+    assert sum(policy.batch_sizes) == 4
+    assert max(policy.batch_sizes) <= 2
+
+
+def test_batching_policy_wrapper_survives_malformed_observation():
+    policy = RecordingPolicy()
+    wrapper = BatchingPolicyWrapper(policy, max_batch_size=4, timeout_ms=200)
+    bad_obs = make_obs(0.0)
+    bad_obs["state.arm_0"] = [[0.0] * 6]  # lists have no shape
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        bad = executor.submit(wrapper.get_action, bad_obs)
+        good = executor.submit(wrapper.get_action, make_obs(1.0))
+        with pytest.raises(AttributeError):
+            bad.result(timeout=5)
+        np.testing.assert_allclose(good.result(timeout=5)["action.arm_0"], 1.0)
+
+    # The loop keeps serving requests afterwards
+    np.testing.assert_allclose(wrapper.get_action(make_obs(2.0))["action.arm_0"], 2.0)
+
+
+def test_batching_policy_wrapper_warms_up_on_the_serving_thread():
+    class WarmupRecordingPolicy(RecordingPolicy):
+        def get_action(self, observations):
+            self.serving_thread = threading.get_ident()
+            return super().get_action(observations)
+
+        def warmup(self, num_iters=2, **kwargs):
+            self.warmup_thread = threading.get_ident()
+            return num_iters
+
+    policy = WarmupRecordingPolicy()
+    wrapper = BatchingPolicyWrapper(policy, max_batch_size=2, timeout_ms=1)
+    assert wrapper.warmup(num_iters=3, batch_sizes=(1, 2)) == 3
+    wrapper.get_action(make_obs(0.0))
+    assert policy.warmup_thread == policy.serving_thread != threading.get_ident()
+
+
+def test_image_decode_policy_wrapper_decodes_and_resizes_jpeg():
+    class EchoPolicy(BasePolicy):
+        def get_action(self, observations):
+            return observations
+
+        def get_modality_config(self):
+            return {}
+
+    obs = make_obs(0.0)
+    obs["video.image_cam_0"] = np.full((2, 32, 48, 3), (200, 100, 50), dtype=np.uint8)
+    encoded = encode_video_jpeg(obs)
+    assert isinstance(encoded["video.image_cam_0"][0], bytes)
+
+    wrapper = ImageDecodePolicyWrapper(
+        EchoPolicy(), resolutions={"video.image_cam_0": (24, 16)}, device="cpu"
+    )
+    decoded = wrapper.get_action(encoded)
+    assert decoded["video.image_cam_0"].shape == (2, 16, 24, 3)
+    assert decoded["video.image_cam_0"].dtype == np.uint8
+    np.testing.assert_allclose(decoded["video.image_cam_0"][0, 8, 12], (200, 100, 50), atol=4)
+    np.testing.assert_array_equal(decoded["state.arm_0"], obs["state.arm_0"])
+
+
+def test_gr00t_policy_rejects_fp32_compute_dtype():
+    # Checked before anything is downloaded or loaded
+    with pytest.raises(ValueError, match="flash_attention_2"):
+        Gr00tPolicy(
+            model_path="unused",
+            embodiment_tag="new_embodiment",
+            modality_config={},
+            modality_transform=None,
+            compute_dtype=torch.float32,
+        )
+
+
+@pytest.mark.skipif(
+    not torch.cuda.is_available() or torch.cuda.get_device_capability() < (8, 9),
+    reason="FP8 requires an Ada or Hopper GPU",
+)
+def test_quantize_fp8_weights_keeps_outputs_close():
+    pytest.importorskip("torchao")
+    policy = Gr00tPolicy.__new__(Gr00tPolicy)
+    policy.model = torch.nn.Sequential(torch.nn.Linear(64, 64), torch.nn.LayerNorm(64)).to(
+        device="cuda", dtype=torch.bfloat16
+    )
+    x = torch.randn(4, 64, device="cuda", dtype=torch.bfloat16)
+    expected = policy.model(x)
+
+    policy.quantize_fp8_weights()
+
+    assert policy.model[1].weight.dtype == torch.bfloat16
+    torch.testing.assert_close(policy.model(x), expected, atol=0.1, rtol=0.1)
+
+
+def make_denoise_request(vl_len: int, step: int = 0) -> DenoiseRequest:
+    state = {
+        "vl_embeds": torch.zeros(1, vl_len, 16),
+        "state_features": torch.zeros(1, 1, 16),
+        "embodiment_id": torch.zeros(1, dtype=torch.long),
+        "actions": torch.zeros(1, 4, 4),
+    }
+    return DenoiseRequest(state=state, future=Future(), step=step)
+
+
+def test_input_batch_schedules_requests_compatible_with_the_oldest():
+    requests = [make_denoise_request(vl_len) for vl_len in (5, 7, 5, 5)]
+    batch = InputBatch(requests=list(requests))
+    assert batch.schedule(max_num_seqs=8) == [requests[0], requests[2], requests[3]]
+    assert batch.schedule(max_num_seqs=2) == [requests[0], requests[2]]
+
+
+def test_input_batch_pop_finished():
+    requests = [make_denoise_request(5, step) for step in (4, 2, 4)]
+    batch = InputBatch(requests=list(requests))
+    assert batch.pop_finished(num_steps=4) == [requests[0], requests[2]]
+    assert batch.requests == [requests[1]]
+
+
+def make_tiny_action_head() -> FlowmatchingActionHead:
+    torch.manual_seed(0)
+    config = FlowmatchingActionHeadConfig(
+        diffusion_model_cfg=dict(
+            num_attention_heads=2,
+            attention_head_dim=8,
+            output_dim=16,
+            num_layers=2,
+            dropout=0.0,
+            final_dropout=False,
+        ),
+        hidden_size=16,
+        input_embedding_dim=16,
+        action_dim=4,
+        action_horizon=4,
+        max_state_dim=6,
+        max_seq_len=16,
+        max_num_embodiments=2,
+        num_inference_timesteps=4,
+    )
+    return FlowmatchingActionHead(config).eval()
+
+
+def test_mixed_step_denoising_matches_sequential_get_action():
+    action_head = make_tiny_action_head()
+    policy = ContinuousBatchingGr00tPolicy.__new__(ContinuousBatchingGr00tPolicy)
+    policy.model = SimpleNamespace(action_head=action_head)
+    policy.compute_dtype = torch.bfloat16
+
+    inputs = []
+    for seed in range(2):
+        torch.manual_seed(100 + seed)
+        backbone_output = BatchFeature(data={"backbone_features": torch.randn(1, 5, 16)})
+        action_input = BatchFeature(
+            data={"state": torch.randn(1, 1, 6), "embodiment_id": torch.zeros(1, dtype=torch.long)}
+        )
+        inputs.append((backbone_output, action_input))
+
+    expected = []
+    for seed, (backbone_output, action_input) in enumerate(inputs):
+        torch.manual_seed(seed)
+        expected.append(action_head.get_action(backbone_output, action_input)["action_pred"])
+
+    requests = []
+    for seed, (backbone_output, action_input) in enumerate(inputs):
+        torch.manual_seed(seed)
+        state = action_head.init_denoise_state(backbone_output, action_input)
+        requests.append(DenoiseRequest(state=dict(state), future=Future()))
+    # The first request is admitted one step earlier, so the two share steps at different times
+    policy.denoise_step(requests[:1])
+    batch = InputBatch(requests=list(requests))
+    while batch.requests:
+        policy.denoise_step(batch.schedule(max_num_seqs=8))
+        batch.pop_finished(action_head.num_inference_timesteps)
+
+    assert [r.step for r in requests] == [4, 4]
+    for request, actions in zip(requests, expected):
+        torch.testing.assert_close(request.state["actions"], actions, atol=1e-5, rtol=1e-5)
+
+
+def test_continuous_batching_admits_compatible_requests_with_one_backbone_pass():
+    batch_sizes = []
+
+    def prepare_denoise_state(inputs):
+        batch_size = inputs["input_ids"].shape[0]
+        batch_sizes.append(batch_size)
+        return BatchFeature(
+            data={
+                "vl_embeds": inputs["input_ids"][..., None].float(),
+                "state_features": inputs["state"],
+                "embodiment_id": inputs["embodiment_id"],
+                "actions": torch.zeros(batch_size, 4, 4),
+            }
+        )
+
+    policy = ContinuousBatchingGr00tPolicy.__new__(ContinuousBatchingGr00tPolicy)
+    policy.model = SimpleNamespace(prepare_denoise_state=prepare_denoise_state)
+    policy.compute_dtype = torch.bfloat16
+    policy._pending = queue.Queue()
+    policy._input_batch = InputBatch()
+
+    inputs = [
+        {
+            "input_ids": torch.full((1, prompt_len), i),
+            "state": torch.full((1, 1, 6), float(i)),
+            "embodiment_id": torch.tensor([31]),
+        }
+        for i, prompt_len in enumerate((5, 7, 5))
+    ]
+    for normalized_input in inputs:
+        policy._pending.put((normalized_input, Future()))
+    policy._admit_pending(block=False)
+
+    # The two requests with 5 prompt tokens share one pass
+    assert sorted(batch_sizes) == [1, 2]
+    assert len(policy._input_batch.requests) == 3
+    for request in policy._input_batch.requests:
+        i = int(request.state["state_features"][0, 0, 0])
+        torch.testing.assert_close(
+            request.state["vl_embeds"][..., 0], inputs[i]["input_ids"].float()
+        )
+        assert request.batch_size == 1
@@ -0,0 +1,215 @@
+import socket
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+import zmq
+
+from gr00t.eval.robot import AsyncRobotInferenceClient, RobotInferenceClient, RobotInferenceServer
+from gr00t.eval.service import (
+    SHM_KEY,
+    SHM_MIN_BYTES,
+    BaseInferenceClient,
+    BaseInferenceServer,
+    attach_shared_arrays,
+    run_load_balancer,
+)
+from gr00t.model.policy import BasePolicy, BatchingPolicyWrapper
+
+
+class ConstantPolicy(BasePolicy):
+    """Returns 16 steps of the last state value and counts its calls."""
+
+    def __init__(self):
+        self.num_calls = 0
+
+    def get_action(self, observations):
+        self.num_calls += 1
+        return {"action.arm_0": np.repeat(observations["state.arm_0"][-1:], 16, axis=0)}
+
+    def get_modality_config(self):
+        return {}
+
+
+class BatchRecordingPolicy(BasePolicy):
+    """Returns 16 steps of the last state value and records the batch sizes it sees."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def get_action(self, observations):
+        state = observations["state.arm_0"]
+        self.batch_sizes.append(state.shape[0] if state.ndim == 3 else 1)
+        return {"action.arm_0": np.repeat(state[..., -1:, :], 16, axis=-2)}
+
+    def get_modality_config(self):
+        return {}
+
+
+def make_obs(value: float = 0.0):
+    return {
+        "video.image_cam_0": np.zeros((1, 8, 8, 3), dtype=np.uint8),
+        "state.arm_0": np.full((1, 6), value, dtype=np.float32),
+        "annotation.human.task_description": "pick up the cube",
+    }
+
+
+@contextmanager
+def serving(server):
+    """Run the server in a background thread and yield the port it is bound to."""
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    port = int(server.socket.getsockopt_string(zmq.LAST_ENDPOINT).rsplit(":", 1)[1])
+    try:
+        yield port
+    finally:
+        BaseInferenceClient(port=port).kill_server()
+        thread.join()
+        # An open socket would block the context from terminating when it is collected
+        server.socket.close()
+        server.context.term()
+
+
+@pytest.fixture
+def robot_server():
+    server = RobotInferenceServer(
+        ConstantPolicy(), host="127.0.0.1", port=0, chunk_size=4, dedup_eps=1.0
+    )
+    with serving(server) as port:
+        yield server, port
+
+
+def test_needs_processing_is_per_client(robot_server):
+    server, _ = robot_server
+    assert server.needs_processing(make_obs(0.0), client_id="a")
+    assert not server.needs_processing(make_obs(0.1), client_id="a")
+    # A second robot in a similar pose is not compared against the first one
+    assert server.needs_processing(make_obs(0.1), client_id="b")
+    assert server.needs_processing(make_obs(5.0), client_id="a")
+
+
+def test_async_client_recovers_from_dropped_chunks(robot_server):
+    server, port = robot_server
+    client = AsyncRobotInferenceClient(port=port, queue_threshold=0.5)
+    # The observation never changes, so every non-must_go request is dropped as a duplicate
+    for _ in range(12):
+        action = client.get_next_action(make_obs(1.0))
+        np.testing.assert_allclose(action["action.arm_0"], 1.0)
+    assert server.model.num_calls >= 3
+
+
+def test_async_client_skips_actions_of_executed_steps(robot_server):
+    _, port = robot_server
+    client = AsyncRobotInferenceClient(port=port, queue_threshold=0.0)
+    client.timestep = 3
+    client._queue = deque((t, {"action.arm_0": np.full(6, t)}) for t in (2, 3, 4))
+
+    np.testing.assert_allclose(client.get_next_action(make_obs())["action.arm_0"], 3)
+    assert client.timestep == 4
+    assert [t for t, _ in client._queue] == [4]
+
+
+def test_async_client_reraises_chunk_request_errors(robot_server):
+    _, port = robot_server
+    client = AsyncRobotInferenceClient(port=port)
+    observations = make_obs()
+    del observations["state.arm_0"]  # the policy fails on the server
+
+    with pytest.raises(RuntimeError, match="Chunk request") as excinfo:
+        client.get_next_action(observations)
+    assert "Server error" in str(excinfo.value.__cause__)
+
+
+def test_concurrent_server_batches_requests_and_routes_replies():
+    policy = BatchRecordingPolicy()
+    server = RobotInferenceServer(
+        BatchingPolicyWrapper(policy, max_batch_size=4, timeout_ms=200),
+        host="127.0.0.1",
+        port=0,
+        num_workers=4,
+    )
+    with serving(server) as port:
+
+        def request(value):
+            return RobotInferenceClient(port=port).get_action(make_obs(value))
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(request, range(4)))
+
+    for value, result in enumerate(results):
+        assert result["action.arm_0"].shape == (16, 6)
+        np.testing.assert_allclose(result["action.arm_0"], value)
+    assert sum(policy.batch_sizes) == 4
+    assert max(policy.batch_sizes) > 1
+
+
+def test_shared_arrays_round_trip():
+    client = BaseInferenceClient(port=1, use_shm=True)
+    large = np.random.rand(SHM_MIN_BYTES // 8 + 1)
+    small = np.arange(4, dtype=np.float32)
+    shared = client._to_shared_arrays({"large": large, "nested": {"small": small}, "text": "hi"})
+
+    assert SHM_KEY in shared["large"]
+    assert shared["nested"]["small"] is small
+    assert shared["text"] == "hi"
+
+    handles = []
+    attached = attach_shared_arrays(shared, handles)
+    np.testing.assert_array_equal(attached["large"], large)
+    np.testing.assert_array_equal(attached["nested"]["small"], small)
+    del attached
+    for shm in handles:
+        shm.close()
+
+
+def test_shared_segments_are_reused_and_grown():
+    client = BaseInferenceClient(port=1, use_shm=True)
+    large = np.zeros(SHM_MIN_BYTES, dtype=np.uint8)
+    name = client._to_shared_arrays({"x": large})["x"][SHM_KEY]
+    assert client._to_shared_arrays({"x": large + 1})["x"][SHM_KEY] == name
+
+    larger = np.zeros(2 * SHM_MIN_BYTES, dtype=np.uint8)
+    assert client._to_shared_arrays({"x": larger})["x"][SHM_KEY] != name
+    assert len(client._shm_segments) == 1
+
+
+@pytest.mark.parametrize("allow_shm", [True, False])
+def test_server_shared_memory_transport(allow_shm):
+    server = BaseInferenceServer(host="127.0.0.1", port=0, allow_shm=allow_shm)
+    server.register_endpoint("echo", lambda data: {k: np.array(v) for k, v in data.items()})
+    frames = np.random.randint(0, 255, (2, 224, 224, 3), dtype=np.uint8)
+
+    with serving(server) as port:
+        client = BaseInferenceClient(port=port, use_shm=True)
+        if allow_shm:
+            np.testing.assert_array_equal(
+                client.call_endpoint("echo", {"frames": frames})["frames"], frames
+            )
+        else:
+            with pytest.raises(RuntimeError):
+                client.call_endpoint("echo", {"frames": frames})
+
+
+def test_load_balancer_spreads_requests_across_workers(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    backend_addr = f"ipc://{tmp_path}/backend.ipc"
+    threading.Thread(
+        target=run_load_balancer, args=("127.0.0.1", port, backend_addr), daemon=True
+    ).start()
+    for worker in range(2):
+        server = BaseInferenceServer(backend_addr=backend_addr)
+        server.register_endpoint("worker", lambda w=worker: {"worker": w}, requires_input=False)
+        threading.Thread(target=server.run, daemon=True).start()
+
+    client = BaseInferenceClient(port=port)
+    workers = set()
+    for _ in range(20):
+        workers.add(client.call_endpoint("worker", requires_input=False)["worker"])
+        if len(workers) == 2:
+            break
+    assert workers == {0, 1}